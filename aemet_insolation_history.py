@@ -22,6 +22,28 @@ Se usar --datai e/ou --dataf, o script baixa dados entre essas datas.
 O argumento --janela define quantos dias cada requisição abrange (padrão 14).
 Isso devido a limitações da API da AEMET.
 
+O argumento --variaveis define quais variáveis da resposta diária são
+extraídas (padrão: sol). Todas são obtidas da mesma requisição, cada uma
+em sua própria coluna numérica. Ex.: --variaveis sol,tmax,tmin,prec
+A insolação (sol) é sempre incluída, pois os arquivos de saída e os
+scripts seguintes dependem da coluna 'insolacao'. Apenas registros com
+insolação são gravados; as demais variáveis acompanham esses registros.
+Os códigos especiais de direção do vento (88 = calma, 99 = variável)
+ficam vazios (NaN).
+
+As colunas numéricas são gravadas com ponto decimal (9.8). Linhas de
+arquivos antigos com vírgula ("9,8") são convertidas ao mesclar.
+
+A resposta original de cada janela é guardada, comprimida e com os
+metadados da requisição, em 'arquivo_bruto/diarios' (ou --bruto DIR;
+ver aemet_raw_archive.py). Use --sem-bruto para não arquivar.
+
+O argumento --replay reconstrói o arquivo de saída a partir das respostas
+arquivadas em --bruto, sem acessar a API. Apenas as janelas que cruzam o
+período pedido são lidas, e os dados arquivados substituem as linhas já
+existentes no arquivo de saída:
+python aemet_insolation_history.py --ano 2023 --replay
+
 O arquivo de saída padrão é 'dataset_daily/insolacao_diaria_ANO.csv',
 onde ANO é o ano especificado. Caso usou --datai e/ou --dataf, o arquivo
 será nomeado como 'dataset_daily/insolacao_diaria_DATAI_DATAF.csv
@@ -29,14 +51,26 @@ será nomeado como 'dataset_daily/insolacao_diaria_DATAI_DATAF.csv
 # Bibliotecas necessárias
 
 import argparse
+import glob
+import json
 import os
+import re
 import time
 from datetime import datetime, timedelta
+from functools import partial
 
 import pandas as pd
 import requests
 
-from utils import gms_to_decimal
+from aemet_raw_archive import (
+    ARQUIVO_DIR,
+    carregar_payload,
+    decodificar,
+    listar_payloads,
+    processar_em_paralelo,
+    salvar_payload,
+)
+from utils import carregar_inventario, para_numerico
 
 # =========================================================
 # Criando a pasta dataset_daily
@@ -45,11 +79,33 @@ from utils import gms_to_decimal
 # cria pasta se não existir
 os.makedirs("dataset_daily", exist_ok=True)
 
+# =========================================================
+# Variáveis disponíveis (chave AEMET → coluna de saída)
+# =========================================================
+VARIAVEIS = {
+    "sol": "insolacao",
+    "tmed": "temp_media",
+    "tmax": "temp_max",
+    "tmin": "temp_min",
+    "prec": "precipitacao",
+    "velmedia": "vento_medio",
+    "racha": "vento_rajada",
+    "dir": "vento_direcao",
+    "hrMedia": "umidade_media",
+    "presMax": "pressao_max",
+    "presMin": "pressao_min",
+}
+
+# Códigos especiais que não são medidas (dir: 88 = calma, 99 = variável)
+SENTINELAS = {
+    "dir": [88, 99],
+}
+
 
 # =========================================================
 # FUNÇÃO: BAIXAR UM PERÍODO
 # =========================================================
-def baixar_periodo(datai, dataf, api_key, tentativas=5):
+def baixar_periodo(datai, dataf, api_key, tentativas=5, bruto=None):
     url = (
         f"https://opendata.aemet.es/opendata/api/valores/climatologicos/"
         f"diarios/datos/fechaini/{datai}T00%3A00%3A00UTC/fechafin/"
@@ -70,8 +126,25 @@ def baixar_periodo(datai, dataf, api_key, tentativas=5):
 
             # segunda requisição
             try:
-                dados = requests.get(controle["datos"]).json()
-                return dados
+                resp_dados = requests.get(controle["datos"])
+
+                # Arquiva antes de interpretar: uma resposta que não é
+                # JSON válido continua disponível para análise e replay
+                if bruto is not None:
+                    salvar_payload(
+                        bruto,
+                        "diarios",
+                        f"{datai}_{dataf}",
+                        resp_dados.content,
+                        {
+                            "url": url,
+                            "url_dados": controle["datos"],
+                            "datai": datai,
+                            "dataf": dataf,
+                            "encoding": resp_dados.encoding,
+                        },
+                    )
+                return resp_dados.json()
             except Exception:
                 print("Erro ao converter JSON dos dados reais.")
                 return None
@@ -88,26 +161,48 @@ def baixar_periodo(datai, dataf, api_key, tentativas=5):
 # =========================================================
 # FUNÇÃO: EXTRAIR CAMPOS FILTRADOS
 # =========================================================
-def extrair_filtrados(lista):
+def extrair_filtrados(lista, variaveis=("sol",)):
     filtrados = []
     for item in lista:
         if "sol" in item:
-            filtrados.append({
+            registro = {
                 "cod": item.get("indicativo"),
                 "provincia": item.get("provincia"),
                 "nome": item.get("nombre"),
                 "alt": item.get("altitud"),
                 "data": item.get("fecha"),
-                "insolacao": item.get("sol")
-            })
+            }
+            for var in variaveis:
+                registro[VARIAVEIS[var]] = item.get(var)
+            filtrados.append(registro)
     return filtrados
 
 
+# =========================================================
+# FUNÇÃO: MONTAR DATAFRAME TIPADO
+# =========================================================
+def montar_dataframe(filtrados, variaveis):
+    df = pd.DataFrame(filtrados)
+    df["data"] = pd.to_datetime(df["data"])
+
+    # Uma coluna numérica por variável ("9,8" → 9.8, "Ip" → 0.0)
+    for var in variaveis:
+        df[VARIAVEIS[var]] = para_numerico(df[VARIAVEIS[var]])
+
+    # Códigos especiais → NaN
+    for var, codigos in SENTINELAS.items():
+        if var in variaveis:
+            coluna = df[VARIAVEIS[var]]
+            df[VARIAVEIS[var]] = coluna.mask(coluna.isin(codigos))
+
+    return df.sort_values(by=["cod", "data"])
+
+
 # =========================================================
 # FUNÇÃO: MESCLAR LAT/LON
 # =========================================================
 def mesclar_lat_lon(df):
-    estacoes = pd.read_csv("todas_estacoes.csv")
+    estacoes = carregar_inventario()
     df_final = df.merge(
         estacoes[["indicativo", "latitud", "longitud"]],
         left_on="cod",
@@ -118,21 +213,35 @@ def mesclar_lat_lon(df):
     df_final.rename(columns={"latitud": "lat", "longitud": "lon"},
                     inplace=True)
 
-    df_final["lat"] = df_final["lat"].apply(gms_to_decimal)
-    df_final["lon"] = df_final["lon"].apply(gms_to_decimal)
-
     return df_final
 
 
 # =========================================================
 # FUNÇÃO: SALVAR APPEND NO MESMO ARQUIVO
 # =========================================================
-def salvar_incremental(df_final, output):
+def salvar_incremental(df_final, output, substituir=False):
+    """
+    Mescla df_final no arquivo de saída.
+
+    Por padrão as linhas já gravadas (cod, data) são mantidas; com
+    substituir=True as linhas de df_final as substituem.
+    """
 
     try:
-        df_old = pd.read_csv(output)
+        df_old = pd.read_csv(output, dtype={"cod": str})
+
+        # Normaliza linhas antigas ("9,8" → 9.8; data como datetime)
+        df_old["data"] = pd.to_datetime(df_old["data"])
+        for coluna in VARIAVEIS.values():
+            if coluna in df_old:
+                df_old[coluna] = para_numerico(df_old[coluna])
+
         df_concat = pd.concat([df_old, df_final], ignore_index=True)
-        df_concat.drop_duplicates(subset=["cod", "data"], inplace=True)
+        df_concat.drop_duplicates(
+            subset=["cod", "data"],
+            keep="last" if substituir else "first",
+            inplace=True,
+        )
     except FileNotFoundError:
         df_concat = df_final
 
@@ -180,21 +289,19 @@ def processar_janela(data_atual, data_limite, args, api_key):
 
     print(f"\n➡ Baixando período {datai} → {dataf}")
 
-    dados = baixar_periodo(datai, dataf, api_key)
+    dados = baixar_periodo(datai, dataf, api_key, bruto=args.bruto)
 
     if dados is None:
         print(f"⚠ Falha no período {datai} → {dataf}. Pulando...")
         return data_atual + timedelta(days=args.janela)
 
-    filtrados = extrair_filtrados(dados)
+    filtrados = extrair_filtrados(dados, args.variaveis)
 
     if not filtrados:
         print(f"⚠ Nenhum dado no período {datai} → {dataf}")
         return data_atual + timedelta(days=args.janela)
 
-    df = pd.DataFrame(filtrados)
-    df["data"] = pd.to_datetime(df["data"])
-    df = df.sort_values(by=["cod", "data"])
+    df = montar_dataframe(filtrados, args.variaveis)
 
     df_final = mesclar_lat_lon(df)
     salvar_incremental(df_final, args.saida)
@@ -202,6 +309,91 @@ def processar_janela(data_atual, data_limite, args, api_key):
     return data_atual + timedelta(days=args.janela)
 
 
+# =========================================================
+# MODO REPLAY (SEM REDE)
+# =========================================================
+def processar_payload_diario(path, variaveis):
+    # Qualquer falha (arquivo truncado, zstd ausente, JSON inválido)
+    # descarta só este payload, sem interromper o replay
+    try:
+        metadados, conteudo = carregar_payload(path)
+        dados = json.loads(decodificar(conteudo, metadados))
+    except Exception as erro:
+        print(f"⚠ Payload inválido: {path} ({erro})")
+        return None
+
+    filtrados = extrair_filtrados(dados, variaveis)
+    if not filtrados:
+        return None
+
+    return montar_dataframe(filtrados, variaveis)
+
+
+def periodo_do_payload(path):
+    """Extrai (datai, dataf) do nome '<datai>_<dataf>' do payload."""
+    match = re.search(
+        r"(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})",
+        os.path.basename(path),
+    )
+    if match is None:
+        return None
+    return (
+        datetime.fromisoformat(match.group(1)),
+        datetime.fromisoformat(match.group(2)),
+    )
+
+
+def listar_payloads_periodo(diretorio, data_atual, data_limite):
+    """
+    Lista os payloads cujas janelas cruzam o período pedido, incluindo os
+    arquivos 'diarios_<datai>_<dataf>.json.gz' de versões anteriores.
+    """
+    paths = listar_payloads(diretorio, "diarios") + sorted(
+        glob.glob(os.path.join(diretorio, "diarios_*.json.gz"))
+    )
+
+    selecionados = []
+    for path in paths:
+        periodo = periodo_do_payload(path)
+        if periodo is None:
+            continue
+        datai, dataf = periodo
+        if datai <= data_limite and dataf >= data_atual:
+            selecionados.append(path)
+
+    return selecionados
+
+
+def replay(args, data_atual, data_limite):
+    diretorio = args.bruto
+    paths = listar_payloads_periodo(diretorio, data_atual, data_limite)
+
+    print(f"♻ Replay de {len(paths)} payloads em {diretorio}")
+
+    resultados = processar_em_paralelo(
+        partial(processar_payload_diario, variaveis=args.variaveis),
+        paths,
+        args.workers,
+    )
+    resultados = [df for df in resultados if df is not None]
+
+    if not resultados:
+        print("⚠ Nenhum dado arquivado encontrado.")
+        return
+
+    df = pd.concat(resultados, ignore_index=True)
+    df = df[(df["data"] >= data_atual) & (df["data"] <= data_limite)]
+
+    if df.empty:
+        print(f"⚠ Nenhum dado arquivado no período "
+              f"{data_atual.date()} → {data_limite.date()}")
+        return
+
+    df = df.drop_duplicates(subset=["cod", "data"], keep="last")
+    df_final = mesclar_lat_lon(df.sort_values(by=["cod", "data"]))
+    salvar_incremental(df_final, args.saida, substituir=True)
+
+
 def definir_saida(args, data_atual, data_limite):
     # Prioridade total para --saida
     if args.saida is not None:
@@ -236,18 +428,69 @@ def main():
         help="""Arquivo de saída
         (default: dataset_daily/insolacao_diaria_ANO.csv)"""
     )
+    parser.add_argument(
+        "--variaveis",
+        type=str,
+        default="sol",
+        help=f"""Variáveis separadas por vírgula (default: sol;
+        sol é sempre incluída). Disponíveis: {", ".join(VARIAVEIS)}"""
+    )
+    parser.add_argument(
+        "--bruto",
+        type=str,
+        default=ARQUIVO_DIR,
+        help="""Diretório do arquivo de respostas brutas
+        (lido por --replay; default: arquivo_bruto)"""
+    )
+    parser.add_argument(
+        "--sem-bruto",
+        action="store_true",
+        help="Não arquiva as respostas baixadas"
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Reconstrói a saída a partir das respostas arquivadas"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processos paralelos no replay (default: nº de CPUs)"
+    )
 
     args = parser.parse_args()
 
+    args.variaveis = [v.strip() for v in args.variaveis.split(",")]
+    invalidas = [v for v in args.variaveis if v not in VARIAVEIS]
+    if invalidas:
+        parser.error(f"variáveis desconhecidas: {', '.join(invalidas)}")
+
+    # A saída é sempre um arquivo de insolação
+    if "sol" not in args.variaveis:
+        args.variaveis.insert(0, "sol")
+
     # if args.saida is None:
     #     args.saida = f"dataset_daily/insolacao_diaria_{args.ano}.csv"
 
-    api_key = carregar_api_key()
+    if args.sem_bruto and args.replay:
+        parser.error("--sem-bruto não pode ser usado com --replay")
+
     data_atual, data_limite = configurar_datas(args)
 
     # Define corretamente o arquivo de saída
     args.saida = definir_saida(args, data_atual, data_limite)
 
+    if args.replay:
+        replay(args, data_atual, data_limite)
+        print(f"\n✔ Replay finalizado: {args.saida}")
+        return
+
+    if args.sem_bruto:
+        args.bruto = None
+
+    api_key = carregar_api_key()
+
     imprimir_cabecalho(args, data_atual, data_limite)
 
     while data_atual <= data_limite:
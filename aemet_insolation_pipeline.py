@@ -9,6 +9,9 @@ Pipeline para processar os arquivos consolidados de insolação diária da AEMET
 Estrutura de saída:
 - dataset_daily/<ano>/
 - dataset_daily/periodos/<datai_dataf>/
+
+Os dias processados também atualizam incrementalmente os rollups
+(ver aemet_rollups.py).
 """
 
 import os
@@ -17,6 +20,9 @@ import re
 import pandas as pd
 from tqdm import tqdm
 
+from aemet_rollups import atualizar_rollups
+from utils import para_numerico
+
 # =========================================================
 # CONFIGURAÇÕES
 # =========================================================
@@ -117,6 +123,9 @@ def main():
             errors="coerce"
         )
 
+        # Insolação numérica (arquivos antigos usam "9,8")
+        df["insolacao"] = para_numerico(df["insolacao"])
+
         # Agrupar por estação
         grouped = df.groupby("cod")
 
@@ -142,6 +151,7 @@ def main():
             if os.path.exists(path_out):
                 df_old = pd.read_csv(path_out)
                 df_old["data"] = pd.to_datetime(df_old["data"])
+                df_old["insolacao"] = para_numerico(df_old["insolacao"])
 
                 df_final = pd.concat(
                     [df_old, df_est],
@@ -167,6 +177,14 @@ def main():
                 encoding="utf-8"
             )
 
+        # Atualizar rollups só depois de todas as estações gravadas
+        atualizar_rollups(
+            "insolacao",
+            df,
+            "cod",
+            ["insolacao"],
+        )
+
         # Remover arquivo consolidado após processamento
         os.remove(path_arquivo)
 
@@ -6,66 +6,211 @@ Os dados são armazenados em arquivos CSV com as seguintes colunas:
 
 provincia, latitud, longitud, altitud, indicativo, nombre, indsinop
 
+O inventário baixado é comparado com o armazenado em 'todas_estacoes.csv'
+em todas as colunas (estações novas, removidas, movidas, renomeadas ou
+com outro campo alterado). Os arquivos só são regravados quando há alguma
+diferença; nesse caso:
+
+- a versão anterior e o diff são guardados em 'inventario/' com data e hora
+- 'todas_estacoes.csv' é atualizado
+- 'todas_estacoes.pkl' (forma binária já interpretada: coordenadas em graus
+  decimais e altitude inteira) é regravado — ver utils.carregar_inventario
 """
 # Bibliotecas
 
+import os
+from datetime import datetime
+
 import pandas as pd
 import requests
 
+from utils import salvar_inventario_binario
+
 # url
 url = (
     "https://opendata.aemet.es/opendata/api/valores/"
     "climatologicos/inventarioestaciones/todasestaciones/"
 )
 
-print(url)
-# Lendo a key do arquivo
-api_key = None
-
-with open("key.txt", "r", encoding="utf-8") as f:
-    for line in f:
-        line = line.strip()
-        if line.startswith("key ="):
-            _, valor = line.split("=", 1)
-            api_key = valor.strip().strip('"')
-
-# Verificação
-if api_key is None:
-    print("ERRO: Não encontrei a chave no arquivo key.txt")
-    exit()
-
-# Cabeçalhos corretos
-headers = {
-    "cache-control": "no-cache"
-}
-
-querystring = {"api_key": api_key}
-
-# Requisição
-response = requests.request("GET", url, headers=headers, params=querystring)
-
-# Retorno
-if response.status_code != 200:
-    print(f"Erro na requisição: {response.status_code}")
-else:
-    print("Resposta recebida:")
-    print(response.text)
-
-controle = response.json()
-
-# Pegando a URL dos dados reais
-url_dados = controle["datos"]
-
-# Segunda requisição: baixando os dados reais
-response_dados = requests.get(url_dados)
-lista_estacoes = response_dados.json()
-
-# Criando DataFrame
-df = pd.DataFrame(lista_estacoes, columns=[
+COLUNAS = [
     "provincia", "latitud", "longitud", "altitud",
     "indicativo", "nombre", "indsinop"
-])
-
-df.to_csv('todas_estacoes.csv', index=False, encoding="utf-8")
+]
 
-print("Arquivo salvo: estacoes_aemet.csv")
+INVENTARIO = "todas_estacoes.csv"
+INVENTARIO_BINARIO = "todas_estacoes.pkl"
+VERSOES_DIR = "inventario"
+
+
+def carregar_api_key():
+    # Lendo a key do arquivo
+    api_key = None
+
+    with open("key.txt", "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("key ="):
+                _, valor = line.split("=", 1)
+                api_key = valor.strip().strip('"')
+
+    # Verificação
+    if api_key is None:
+        print("ERRO: Não encontrei a chave no arquivo key.txt")
+        exit()
+
+    return api_key
+
+
+def baixar_inventario(api_key):
+    print(url)
+
+    # Cabeçalhos corretos
+    headers = {
+        "cache-control": "no-cache"
+    }
+
+    querystring = {"api_key": api_key}
+
+    # Requisição
+    response = requests.request(
+        "GET", url, headers=headers, params=querystring
+    )
+
+    # Retorno
+    if response.status_code != 200:
+        print(f"Erro na requisição: {response.status_code}")
+    else:
+        print("Resposta recebida:")
+        print(response.text)
+
+    controle = response.json()
+
+    # Pegando a URL dos dados reais
+    url_dados = controle["datos"]
+
+    # Segunda requisição: baixando os dados reais
+    response_dados = requests.get(url_dados)
+    lista_estacoes = response_dados.json()
+
+    # Criando DataFrame (tudo como texto, igual ao CSV armazenado)
+    df = pd.DataFrame(lista_estacoes, columns=COLUNAS)
+    return df.fillna("").astype(str)
+
+
+def comparar_inventarios(antigo, novo):
+    """
+    Compara dois inventários pelo indicativo.
+
+    Todas as colunas de COLUNAS são comparadas.
+
+    Retorna DataFrame com: indicativo, mudanca, antes, depois
+    mudanca ∈ {nova, removida, movida, renomeada, alterada}
+    (alterada: provincia ou indsinop)
+    """
+    mesclado = antigo.merge(
+        novo,
+        on="indicativo",
+        how="outer",
+        suffixes=("_antes", "_depois"),
+        indicator=True,
+    )
+
+    def descrever(df, sufixo, colunas):
+        texto = df[f"{colunas[0]}{sufixo}"]
+        for c in colunas[1:]:
+            texto = texto + " " + df[f"{c}{sufixo}"]
+        return texto
+
+    def registrar(df, mudanca, colunas):
+        return pd.DataFrame({
+            "indicativo": df["indicativo"],
+            "mudanca": mudanca,
+            "antes": descrever(df, "_antes", colunas),
+            "depois": descrever(df, "_depois", colunas),
+        })
+
+    ambos = mesclado[mesclado["_merge"] == "both"]
+
+    def alterados(colunas):
+        filtro = pd.Series(False, index=ambos.index)
+        for c in colunas:
+            filtro |= ambos[f"{c}_antes"] != ambos[f"{c}_depois"]
+        return ambos[filtro]
+
+    posicao = ["latitud", "longitud", "altitud"]
+    outros = [
+        c for c in COLUNAS
+        if c not in posicao + ["indicativo", "nombre"]
+    ]
+
+    diff = pd.concat(
+        [
+            registrar(
+                mesclado[mesclado["_merge"] == "right_only"],
+                "nova",
+                ["nombre"],
+            ),
+            registrar(
+                mesclado[mesclado["_merge"] == "left_only"],
+                "removida",
+                ["nombre"],
+            ),
+            registrar(alterados(posicao), "movida", posicao),
+            registrar(alterados(["nombre"]), "renomeada", ["nombre"]),
+            registrar(alterados(outros), "alterada", outros),
+        ],
+        ignore_index=True,
+    )
+    return diff.sort_values(["mudanca", "indicativo"], ignore_index=True)
+
+
+def salvar_inventario(df, antigo, diff):
+    os.makedirs(VERSOES_DIR, exist_ok=True)
+    carimbo = datetime.now().strftime("%Y%m%dT%H%M%S")
+
+    if antigo is not None:
+        antigo.to_csv(
+            os.path.join(VERSOES_DIR, f"todas_estacoes_{carimbo}.csv"),
+            index=False,
+            encoding="utf-8",
+        )
+    diff.to_csv(
+        os.path.join(VERSOES_DIR, f"diff_{carimbo}.csv"),
+        index=False,
+        encoding="utf-8",
+    )
+
+    df.to_csv(INVENTARIO, index=False, encoding="utf-8")
+    salvar_inventario_binario(df, INVENTARIO_BINARIO)
+
+    print(f"Arquivo salvo: {INVENTARIO} (versão {carimbo})")
+
+
+def main():
+    api_key = carregar_api_key()
+    df = baixar_inventario(api_key)
+
+    if os.path.exists(INVENTARIO):
+        antigo = pd.read_csv(INVENTARIO, dtype=str, keep_default_na=False)
+        diff = comparar_inventarios(antigo, df)
+    else:
+        antigo = None
+        diff = pd.DataFrame({
+            "indicativo": df["indicativo"],
+            "mudanca": "nova",
+            "antes": "",
+            "depois": df["nombre"],
+        })
+
+    if diff.empty:
+        print(f"Inventário sem alterações: {INVENTARIO} mantido")
+        return
+
+    print("Alterações no inventário:")
+    print(diff["mudanca"].value_counts().to_string())
+
+    salvar_inventario(df, antigo, diff)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Controle de qualidade (QC) vetorizado dos dados de insolação e radiação.
+
+Os arquivos por estação são lidos apenas com as colunas necessárias e
+concatenados em um único lote colunar; todas as verificações são feitas
+de uma vez sobre o lote (sem laços linha a linha).
+
+Verificações:
+- Lacuna: valor ausente (NaN) ou dias faltantes na série da estação
+- Negativo: valor menor que zero
+- Acima do limite: insolação maior que a duração astronômica do dia
+  (latitude da estação) ou radiação horária acima do máximo físico
+- Travado: mesmo valor não nulo repetido em sequência (sensor travado)
+- Duplicado: chave (estação, data[, hora]) repetida no conjunto
+
+Saída (pasta 'qc'):
+- qc/<conjunto>_flags.csv   → chaves + coluna compacta 'qc_flag' (bits)
+- qc/<conjunto>_lacunas.csv → relatório de dias faltantes por estação
+
+Exemplo de uso:
+python aemet_quality_control.py
+python aemet_quality_control.py --conjunto radiacao --min-repeticoes 4
+"""
+
+# =========================================================
+# Bibliotecas
+# =========================================================
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils import duracao_dia, para_numerico
+
+# =========================================================
+# CONFIGURAÇÕES
+# =========================================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSOLACAO_DIR = os.path.join(BASE_DIR, "dataset_daily")
+RADIACAO_DIR = os.path.join(BASE_DIR, "real_time")
+QC_DIR = os.path.join(BASE_DIR, "qc")
+
+# Bits da coluna qc_flag (combináveis)
+QC_LACUNA = 1
+QC_NEGATIVO = 2
+QC_ACIMA_LIMITE = 4
+QC_TRAVADO = 8
+QC_DUPLICADO = 16
+
+# Máximo físico horário em 10 × kJ/m²
+# (constante solar 1361 W/m² × 3600 s ≈ 4900 kJ/m²)
+LIMITE_RADIACAO_HORARIA = 490
+
+# Tolerância (h) sobre a duração astronômica do dia
+TOLERANCIA_INSOLACAO = 0.1
+
+COLUNAS_RADIACAO = ["GL", "DF", "DT"]
+
+
+# =========================================================
+# FUNÇÕES DE LEITURA (LOTE COLUNAR)
+# =========================================================
+def carregar_insolacao(base_dir=INSOLACAO_DIR):
+    """Lê todos os arquivos diários por estação em um único DataFrame."""
+    arquivos = glob.glob(
+        os.path.join(base_dir, "**", "*_diario.csv"),
+        recursive=True,
+    )
+    if not arquivos:
+        return pd.DataFrame({
+            "cod": pd.Series(dtype=str),
+            "data": pd.Series(dtype="datetime64[ns]"),
+            "insolacao": pd.Series(dtype=float),
+            "lat": pd.Series(dtype=float),
+        })
+
+    df = pd.concat(
+        (
+            pd.read_csv(
+                arquivo,
+                usecols=["cod", "data", "insolacao", "lat"],
+                dtype={"cod": str, "insolacao": str},
+            )
+            for arquivo in arquivos
+        ),
+        ignore_index=True,
+    )
+
+    df["data"] = pd.to_datetime(df["data"], errors="coerce").dt.normalize()
+    df["insolacao"] = para_numerico(df["insolacao"])
+    return df
+
+
+def carregar_radiacao(base_dir=RADIACAO_DIR):
+    """Lê todos os arquivos de radiação em um único DataFrame."""
+    sufixo = "_radiacion_completo.csv"
+    arquivos = glob.glob(os.path.join(base_dir, f"*{sufixo}"))
+    if not arquivos:
+        return pd.DataFrame({
+            "estacao": pd.Series(dtype=str),
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "hora": pd.Series(dtype=int),
+            **{col: pd.Series(dtype=float) for col in COLUNAS_RADIACAO},
+        })
+
+    df = pd.concat(
+        (
+            pd.read_csv(arquivo).assign(
+                estacao=os.path.basename(arquivo)[: -len(sufixo)]
+            )
+            for arquivo in arquivos
+        ),
+        ignore_index=True,
+    )
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df
+
+
+# =========================================================
+# FUNÇÕES DE VERIFICAÇÃO (VETORIZADAS)
+# =========================================================
+def flag_travado(df, chave, coluna, min_repeticoes):
+    """
+    Marca sequências de min_repeticoes ou mais valores iguais e não nulos
+    consecutivos dentro da mesma estação. O DataFrame deve estar ordenado.
+    """
+    valores = df[coluna]
+    inicio_seq = (valores != valores.shift()) | (
+        df[chave] != df[chave].shift()
+    )
+    id_seq = inicio_seq.cumsum()
+    tamanho = id_seq.map(id_seq.value_counts())
+
+    travado = (tamanho >= min_repeticoes) & valores.notna() & (valores != 0)
+    return np.where(travado, QC_TRAVADO, 0)
+
+
+def flags_valor(valores, limite):
+    """Bits de lacuna, negativo e acima do limite para uma série."""
+    return (
+        np.where(valores.isna(), QC_LACUNA, 0)
+        | np.where(valores < 0, QC_NEGATIVO, 0)
+        | np.where(valores > limite, QC_ACIMA_LIMITE, 0)
+    )
+
+
+def relatorio_lacunas(df, chave, coluna_data):
+    """
+    Relatório de dias faltantes por estação.
+
+    Retorna DataFrame com: <chave>, inicio, fim, dias
+    """
+    dias = (
+        df[[chave, coluna_data]]
+        .dropna()
+        .drop_duplicates()
+        .sort_values([chave, coluna_data])
+    )
+
+    anterior = dias.groupby(chave)[coluna_data].shift()
+    salto = (dias[coluna_data] - anterior).dt.days
+    com_lacuna = salto > 1
+
+    um_dia = pd.Timedelta(days=1)
+    return pd.DataFrame(
+        {
+            chave: dias.loc[com_lacuna, chave].values,
+            "inicio": (anterior[com_lacuna] + um_dia).dt.strftime(
+                "%Y-%m-%d"
+            ).values,
+            "fim": (dias.loc[com_lacuna, coluna_data] - um_dia).dt.strftime(
+                "%Y-%m-%d"
+            ).values,
+            "dias": (salto[com_lacuna] - 1).astype(int).values,
+        }
+    )
+
+
+def qc_insolacao(df, min_repeticoes=5):
+    """Aplica todas as verificações ao lote de insolação diária."""
+    df = df.sort_values(["cod", "data"], kind="stable").reset_index(
+        drop=True
+    )
+
+    limite = duracao_dia(df["lat"], df["data"].dt.dayofyear)
+    limite = limite + TOLERANCIA_INSOLACAO
+
+    flags = (
+        flags_valor(df["insolacao"], limite)
+        | flag_travado(df, "cod", "insolacao", min_repeticoes)
+        | np.where(
+            df.duplicated(["cod", "data"], keep=False), QC_DUPLICADO, 0
+        )
+    )
+    df["qc_flag"] = flags.astype(np.uint8)
+
+    lacunas = relatorio_lacunas(df, "cod", "data")
+    return df[["cod", "data", "insolacao", "qc_flag"]], lacunas
+
+
+def qc_radiacao(df, min_repeticoes=4):
+    """Aplica todas as verificações ao lote de radiação horária."""
+    df = df.sort_values(["estacao", "date", "hora"], kind="stable")
+    df = df.reset_index(drop=True)
+
+    flags = np.where(
+        df.duplicated(["estacao", "date", "hora"], keep=False),
+        QC_DUPLICADO,
+        0,
+    )
+    for coluna in COLUNAS_RADIACAO:
+        flags = (
+            flags
+            | flags_valor(df[coluna], LIMITE_RADIACAO_HORARIA)
+            | flag_travado(df, "estacao", coluna, min_repeticoes)
+        )
+    df["qc_flag"] = flags.astype(np.uint8)
+
+    lacunas = relatorio_lacunas(df, "estacao", "date")
+    colunas = ["estacao", "date", "hora"] + COLUNAS_RADIACAO + ["qc_flag"]
+    return df[colunas], lacunas
+
+
+# =========================================================
+# FUNÇÃO: SALVAR RESULTADOS
+# =========================================================
+def salvar_resultados(conjunto, flags, lacunas):
+    os.makedirs(QC_DIR, exist_ok=True)
+
+    path_flags = os.path.join(QC_DIR, f"{conjunto}_flags.csv")
+    path_lacunas = os.path.join(QC_DIR, f"{conjunto}_lacunas.csv")
+
+    flags.to_csv(path_flags, index=False, encoding="utf-8",
+                 date_format="%Y-%m-%d")
+    lacunas.to_csv(path_lacunas, index=False, encoding="utf-8")
+
+    sinalizados = int((flags["qc_flag"] != 0).sum())
+    print(f"✔ {conjunto}: {len(flags)} registros, "
+          f"{sinalizados} sinalizados, {len(lacunas)} lacunas")
+    print(f"  - {path_flags}")
+    print(f"  - {path_lacunas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Controle de qualidade AEMET"
+    )
+    parser.add_argument(
+        "--conjunto",
+        choices=["insolacao", "radiacao", "todos"],
+        default="todos",
+        help="Conjunto de dados a verificar (default: todos)",
+    )
+    parser.add_argument(
+        "--min-repeticoes",
+        type=int,
+        default=None,
+        help="""Repetições consecutivas para sensor travado
+        (default: 5 dias para insolação, 4 horas para radiação)""",
+    )
+    args = parser.parse_args()
+
+    opcoes = {}
+    if args.min_repeticoes is not None:
+        opcoes["min_repeticoes"] = args.min_repeticoes
+
+    if args.conjunto in ("insolacao", "todos"):
+        flags, lacunas = qc_insolacao(carregar_insolacao(), **opcoes)
+        salvar_resultados("insolacao", flags, lacunas)
+
+    if args.conjunto in ("radiacao", "todos"):
+        flags, lacunas = qc_radiacao(carregar_radiacao(), **opcoes)
+        salvar_resultados("radiacao", flags, lacunas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo de respostas brutas da API da AEMET.
+
+Cada resposta é guardada comprimida (zstd, se o pacote `zstandard` estiver
+instalado; caso contrário gzip) junto com os metadados da requisição:
+
+arquivo_bruto/<fonte>/<nome>.zst | .gz
+
+Formato (após descompressão):
+- 1ª linha: JSON com os metadados (fonte, url, parâmetros, data do
+  download, encoding). A chave da API nunca é gravada.
+- restante: conteúdo original da resposta, byte a byte.
+
+O modo replay dos scripts lê estes arquivos e reconstrói as saídas sem
+acessar a rede, processando os payloads em paralelo.
+"""
+
+# =========================================================
+# Bibliotecas
+# =========================================================
+import glob
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:  # dependência opcional
+    zstandard = None
+
+# =========================================================
+# CONFIGURAÇÕES
+# =========================================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_DIR = os.path.join(BASE_DIR, "arquivo_bruto")
+
+EXTENSOES = (".zst", ".gz")
+
+
+# =========================================================
+# COMPRESSÃO
+# =========================================================
+def comprimir(dados):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(dados), ".zst"
+    return gzip.compress(dados), ".gz"
+
+
+def descomprimir(dados, path):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(
+                f"❌ Pacote 'zstandard' necessário para ler {path}"
+            )
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return gzip.decompress(dados)
+
+
+# =========================================================
+# FUNÇÕES: SALVAR / CARREGAR / LISTAR
+# =========================================================
+def salvar_payload(diretorio, fonte, nome, conteudo, metadados):
+    """
+    Guarda `conteudo` (bytes) comprimido em <diretorio>/<fonte>/<nome>.
+
+    Um payload já existente com o mesmo nome é substituído.
+    Retorna o caminho do arquivo gravado.
+    """
+    pasta = os.path.join(diretorio, fonte)
+    os.makedirs(pasta, exist_ok=True)
+
+    metadados = {
+        "fonte": fonte,
+        "baixado_em": datetime.now(timezone.utc).isoformat(
+            timespec="seconds"
+        ),
+        **metadados,
+    }
+    cabecalho = json.dumps(metadados, ensure_ascii=False).encode("utf-8")
+    dados, extensao = comprimir(cabecalho + b"\n" + conteudo)
+
+    # Remove versões anteriores (outra compressão)
+    for ext in EXTENSOES:
+        antigo = os.path.join(pasta, nome + ext)
+        if os.path.exists(antigo) and ext != extensao:
+            os.remove(antigo)
+
+    path = os.path.join(pasta, nome + extensao)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dados)
+    os.replace(tmp, path)
+
+    return path
+
+
+def carregar_payload(path):
+    """
+    Lê um payload arquivado.
+
+    Retorna (metadados, conteudo), com conteudo em bytes. Arquivos sem
+    linha de metadados (gzip simples) retornam metadados vazios.
+    """
+    with open(path, "rb") as f:
+        dados = descomprimir(f.read(), path)
+
+    cabecalho, _, conteudo = dados.partition(b"\n")
+    try:
+        metadados = json.loads(cabecalho)
+    except ValueError:
+        metadados = None
+
+    if not isinstance(metadados, dict) or "fonte" not in metadados:
+        return {}, dados
+
+    return metadados, conteudo
+
+
+def ler_arquivo(path):
+    """
+    Lê um payload arquivado ou um arquivo de texto simples.
+
+    Retorna (metadados, conteudo) como em carregar_payload.
+    """
+    if path.endswith(EXTENSOES):
+        return carregar_payload(path)
+
+    with open(path, "rb") as f:
+        return {}, f.read()
+
+
+def decodificar(conteudo, metadados):
+    """Converte o conteúdo bruto em texto usando o encoding original."""
+    encoding = metadados.get("encoding") or "utf-8"
+    try:
+        return conteudo.decode(encoding)
+    except UnicodeDecodeError:
+        return conteudo.decode("latin-1")
+
+
+def listar_payloads(diretorio, fonte):
+    """Lista (ordenados por nome) os payloads arquivados de uma fonte."""
+    return sorted(
+        path
+        for ext in EXTENSOES
+        for path in glob.glob(os.path.join(diretorio, fonte, f"*{ext}"))
+    )
+
+
+# =========================================================
+# PROCESSAMENTO PARALELO
+# =========================================================
+def processar_em_paralelo(funcao, paths, workers=None):
+    """
+    Aplica `funcao` a cada payload em processos paralelos.
+
+    `funcao` deve ser definida no nível do módulo (picklable).
+    Os resultados são retornados na mesma ordem de `paths`.
+    """
+    if not paths:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(funcao, paths))
@@ -8,38 +8,77 @@ date, hora, GL, DF, DT
 A cada execução:
 - Se a data não existir no arquivo, ela é adicionada
 - Se a data existir:
-    - Valores existentes não são sobrescritos
-    - Apenas colunas faltantes (NaN) são preenchidas
+    - Valores novos não nulos substituem os existentes (o cron roda várias
+      vezes ao dia e recolhe horas revisadas)
+    - Valores ausentes (NaN) na resposta nova mantêm os existentes
+
+Os totais diários resultantes também atualizam incrementalmente os
+rollups (ver aemet_rollups.py).
+
+Cada resposta baixada é guardada comprimida em 'arquivo_bruto/radiacion',
+com a data e hora do download no nome, antes de ser interpretada
+(ver aemet_raw_archive.py). Com --replay os CSVs são reconstruídos a
+partir desse arquivo, sem acessar a API; a regra é a da atualização
+diária, em ordem de download (o mais recente vence e substitui os
+valores gravados):
+python aemet_real_time_radiation.py --replay
+
+Com --backfill DIR são ingeridos todos os arquivos diários de DIR
+(payloads arquivados .zst/.gz ou texto simples .txt/.csv), permitindo
+recuperar dias perdidos. Os arquivos são interpretados em paralelo e
+todos os dias são mesclados com uma única escrita por estação. O backfill
+apenas preenche lacunas: valores já gravados não são sobrescritos e,
+entre arquivos do mesmo dia, vale o primeiro valor não nulo. Arquivos
+ilegíveis são ignorados:
+python aemet_real_time_radiation.py --backfill /caminho/para/arquivos
 """
 
 # =========================================================
 # Bibliotecas
 # =========================================================
+import argparse
+import glob
 import os
 import re
 import time
+from collections import defaultdict
 from datetime import datetime
 
 import pandas as pd
 import requests
 
+from aemet_raw_archive import (
+    ARQUIVO_DIR,
+    EXTENSOES,
+    decodificar,
+    ler_arquivo,
+    listar_payloads,
+    processar_em_paralelo,
+    salvar_payload,
+)
+from aemet_rollups import atualizar_rollups, diario_radiacao
+
 # =========================================================
 # 1. Ler API KEY
 # =========================================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 KEY_PATH = os.path.join(BASE_DIR, "key.txt")
 
-api_key = None
 
-with open(KEY_PATH, "r", encoding="utf-8") as file:
-    for line in file:
-        line = line.strip()
-        if line.startswith("key ="):
-            _, value = line.split("=", 1)
-            api_key = value.strip().strip('"')
+def carregar_api_key():
+    api_key = None
+
+    with open(KEY_PATH, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("key ="):
+                _, value = line.split("=", 1)
+                api_key = value.strip().strip('"')
+
+    if api_key is None:
+        raise RuntimeError("❌ API key não encontrada em key.txt")
 
-if api_key is None:
-    raise RuntimeError("❌ API key não encontrada em key.txt")
+    return api_key
 
 
 # =========================================================
@@ -47,13 +86,12 @@ if api_key is None:
 # =========================================================
 URL = "https://opendata.aemet.es/opendata/api/red/especial/radiacion"
 HEADERS = {"cache-control": "no-cache"}
-PARAMS = {"api_key": api_key}
 
 
 # =========================================================
 # 3. Requisição com retry
 # =========================================================
-def request_with_retries(max_attempts=3, wait_seconds=90):
+def request_with_retries(api_key, max_attempts=3, wait_seconds=90):
     """Solicita a URL de dados com tentativas e espera."""
     attempts = 0
 
@@ -62,7 +100,7 @@ def request_with_retries(max_attempts=3, wait_seconds=90):
         response = requests.get(
             URL,
             headers=HEADERS,
-            params=PARAMS,
+            params={"api_key": api_key},
             timeout=60,
         )
 
@@ -127,88 +165,113 @@ def extrair_bloco(cols, pos_tipo):
 
 
 # =========================================================
-# 7. Obter dados
+# 7. Interpretar o texto da resposta
 # =========================================================
-url_dados = request_with_retries()
-response = requests.get(url_dados, timeout=60)
-raw_text = response.text
+def processar_texto(raw_text):
+    """
+    Converte o texto de um dia em DataFrames horários por estação.
+
+    Retorna (data_iso, {nome_normalizado: DataFrame}).
+    """
+    lines = [
+        line.strip()
+        for line in raw_text.split("\n")
+        if line.strip()
+    ]
+
+    data_bruta = lines[1].replace('"', "")
+    data_iso = datetime.strptime(
+        data_bruta,
+        "%d-%m-%y",
+    ).strftime("%Y-%m-%d")
+
+    estacoes = {}
+
+    for line in lines[3:]:
+        cols = [col.strip('"') for col in line.split(";")]
+
+        nome_estacao = cols[0]
+
+        pos_tipos = [
+            i for i, value in enumerate(cols)
+            if value in {"GL", "DF", "DT"}
+        ]
+
+        if len(pos_tipos) < 3:
+            print(f"⚠ Estação ignorada (dados incompletos): {nome_estacao}")
+            continue
+
+        pos_gl, pos_df, pos_dt = pos_tipos[:3]
+
+        gl_horas = extrair_bloco(cols, pos_gl)
+        df_horas = extrair_bloco(cols, pos_df)
+        dt_horas = extrair_bloco(cols, pos_dt)
+
+        df_novo = pd.DataFrame(
+            {
+                "date": data_iso,
+                "hora": list(range(5, 21)),
+                "GL": gl_horas,
+                "DF": df_horas,
+                "DT": dt_horas,
+            }
+        ).astype(
+            {
+                "hora": int,
+                "GL": "float",
+                "DF": "float",
+                "DT": "float",
+            }
+        )
+
+        nome_normalizado = normalizar_nome_estacao(nome_estacao)
+        nome_normalizado = ARQUIVOS_ESPECIAIS.get(
+            nome_normalizado,
+            nome_normalizado,
+        )
 
-lines = [
-    line.strip()
-    for line in raw_text.split("\n")
-    if line.strip()
-]
+        estacoes[nome_normalizado] = df_novo
 
-data_bruta = lines[1].replace('"', "")
-data_iso = datetime.strptime(
-    data_bruta,
-    "%d-%m-%y",
-).strftime("%Y-%m-%d")
+    return data_iso, estacoes
 
-stations_lines = lines[3:]
+
+def processar_payload(path):
+    """
+    Interpreta um payload arquivado ou arquivo de texto (usado em paralelo
+    no replay e no backfill). Retorna None se o arquivo for inválido.
+    """
+    # Qualquer falha (gzip truncado, zstd ausente ou corrompido, texto
+    # inválido) descarta só este arquivo, sem interromper o lote
+    try:
+        metadados, conteudo = ler_arquivo(path)
+        return processar_texto(decodificar(conteudo, metadados))
+    except Exception as erro:
+        print(f"⚠ Arquivo ignorado: {path} ({erro})")
+        return None
 
 
 # =========================================================
 # 8. Pasta de saída
 # =========================================================
 OUTPUT_DIR = os.path.join(BASE_DIR, "real_time")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 # =========================================================
-# 9. Processamento por estação
+# 9. Atualização inteligente do CSV
 # =========================================================
-for line in stations_lines:
-    cols = [col.strip('"') for col in line.split(";")]
-
-    nome_estacao = cols[0]
-
-    pos_tipos = [
-        i for i, value in enumerate(cols)
-        if value in {"GL", "DF", "DT"}
-    ]
-
-    if len(pos_tipos) < 3:
-        print(f"⚠ Estação ignorada (dados incompletos): {nome_estacao}")
-        continue
-
-    pos_gl, pos_df, pos_dt = pos_tipos[:3]
-
-    gl_horas = extrair_bloco(cols, pos_gl)
-    df_horas = extrair_bloco(cols, pos_df)
-    dt_horas = extrair_bloco(cols, pos_dt)
-
-    df_novo = pd.DataFrame(
-        {
-            "date": data_iso,
-            "hora": list(range(5, 21)),
-            "GL": gl_horas,
-            "DF": df_horas,
-            "DT": dt_horas,
-        }
-    ).astype(
-        {
-            "hora": int,
-            "GL": "float",
-            "DF": "float",
-            "DT": "float",
-        }
-    )
-
-    nome_normalizado = normalizar_nome_estacao(nome_estacao)
-    nome_normalizado = ARQUIVOS_ESPECIAIS.get(
-        nome_normalizado,
-        nome_normalizado,
-    )
+def atualizar_estacao(nome_normalizado, df_novo, preencher_apenas=False):
+    """
+    Mescla df_novo no CSV da estação e retorna o DataFrame final.
 
+    Por padrão os valores não nulos de df_novo substituem os gravados.
+    Com preencher_apenas=True os valores gravados são mantidos e df_novo
+    só preenche horas ausentes ou NaN.
+    """
     output_path = os.path.join(
         OUTPUT_DIR,
         f"{nome_normalizado}_radiacion_completo.csv",
     )
 
-    # =====================================================
-    # 10. Atualização inteligente do CSV
-    # =====================================================
     if os.path.exists(output_path):
         df_existente = pd.read_csv(
             output_path,
@@ -226,9 +289,14 @@ for line in stations_lines:
         )
 
         for col in ["GL", "DF", "DT"]:
-            df_merged[col] = df_merged[col].combine_first(
-                df_merged[f"{col}_old"]
-            )
+            if preencher_apenas:
+                df_merged[col] = df_merged[f"{col}_old"].combine_first(
+                    df_merged[col]
+                )
+            else:
+                df_merged[col] = df_merged[col].combine_first(
+                    df_merged[f"{col}_old"]
+                )
             df_merged.drop(
                 columns=f"{col}_old",
                 inplace=True,
@@ -248,6 +316,8 @@ for line in stations_lines:
         print(f"🔄 Dados atualizados: {output_path}")
 
     else:
+        df_merged = df_novo
+
         df_novo.to_csv(
             output_path,
             index=False,
@@ -255,3 +325,163 @@ for line in stations_lines:
         )
 
         print(f"✔ Arquivo criado: {output_path}")
+
+    return df_merged
+
+
+# =========================================================
+# 10. Processamento por estação
+# =========================================================
+def processar_lote(resultados, preencher_apenas=False):
+    """
+    Mescla todos os dias de `resultados` (lista de (data_iso, estacoes))
+    com uma única escrita por estação e retorna os totais diários.
+
+    Precedência (ver atualizar_estacao): por padrão vence o último valor
+    não nulo na ordem (data, caminho) e ele substitui o valor gravado.
+    Com preencher_apenas=True vence o primeiro e os valores gravados são
+    mantidos.
+    """
+    por_estacao = defaultdict(list)
+    for data_iso, estacoes in resultados:
+        for nome_normalizado, df_novo in estacoes.items():
+            por_estacao[nome_normalizado].append(df_novo)
+
+    diarios = []
+
+    for nome_normalizado, dfs in por_estacao.items():
+        grupos = pd.concat(dfs, ignore_index=True).groupby(
+            ["date", "hora"], as_index=False
+        )
+        df_novo = grupos.first() if preencher_apenas else grupos.last()
+        df_merged = atualizar_estacao(
+            nome_normalizado, df_novo, preencher_apenas
+        )
+
+        datas = df_merged["date"].isin(df_novo["date"].unique())
+        diarios.append(
+            diario_radiacao(
+                df_merged[datas].assign(estacao=nome_normalizado)
+            )
+        )
+
+    return diarios
+
+
+# =========================================================
+# 11. Atualização dos rollups
+# =========================================================
+def atualizar_rollups_radiacao(diarios):
+    if diarios:
+        atualizar_rollups(
+            "radiacao",
+            pd.concat(diarios, ignore_index=True),
+            "estacao",
+            ["GL", "DF", "DT"],
+        )
+
+
+# =========================================================
+# 12. Execução
+# =========================================================
+def baixar(args):
+    api_key = carregar_api_key()
+
+    url_dados = request_with_retries(api_key)
+    response = requests.get(url_dados, timeout=60)
+
+    # Arquiva antes de interpretar: uma resposta que o parser não aceita
+    # continua disponível para replay após a correção
+    salvar_payload(
+        args.bruto,
+        "radiacion",
+        datetime.now().strftime("%Y%m%dT%H%M%S"),
+        response.content,
+        {
+            "url": URL,
+            "url_dados": url_dados,
+            "encoding": response.encoding,
+        },
+    )
+
+    data_iso, estacoes = processar_texto(response.text)
+
+    atualizar_rollups_radiacao(processar_lote([(data_iso, estacoes)]))
+
+
+def ingerir(paths, workers, preencher_apenas=False):
+    """Interpreta os arquivos em paralelo e mescla todos os dias."""
+    resultados = processar_em_paralelo(processar_payload, paths, workers)
+    resultados = sorted(
+        (r for r in resultados if r is not None),
+        key=lambda r: r[0],
+    )  # ordenação estável: mesma data mantém a ordem dos caminhos
+
+    print(f"📅 {len(resultados)} dias válidos em {len(paths)} arquivos")
+    atualizar_rollups_radiacao(
+        processar_lote(resultados, preencher_apenas)
+    )
+
+
+def replay(args):
+    paths = listar_payloads(args.bruto, "radiacion")
+    print(f"♻ Replay de {len(paths)} payloads em {args.bruto}")
+    ingerir(paths, args.workers)
+
+
+def backfill(args):
+    extensoes = EXTENSOES + (".txt", ".csv")
+    paths = sorted(
+        path
+        for path in glob.glob(
+            os.path.join(args.backfill, "**", "*"),
+            recursive=True,
+        )
+        if path.endswith(extensoes)
+    )
+    print(f"⏪ Backfill de {len(paths)} arquivos em {args.backfill}")
+    ingerir(paths, args.workers, preencher_apenas=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Radiação AEMET (D-1)")
+    parser.add_argument(
+        "--bruto",
+        type=str,
+        default=ARQUIVO_DIR,
+        help="Diretório do arquivo de respostas brutas "
+        "(default: arquivo_bruto)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Reconstrói os CSVs a partir das respostas arquivadas",
+    )
+    parser.add_argument(
+        "--backfill",
+        type=str,
+        default=None,
+        help="Diretório com arquivos diários a ingerir "
+        "(.zst, .gz, .txt ou .csv)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processos paralelos no replay/backfill "
+        "(default: nº de CPUs)",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    if args.backfill is not None:
+        backfill(args)
+    elif args.replay:
+        replay(args)
+    else:
+        baixar(args)
+
+
+if __name__ == "__main__":
+    main()
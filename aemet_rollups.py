@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados pré-calculados (rollups) de insolação e radiação, mantidos de
+forma incremental.
+
+Para cada conjunto são mantidas as tabelas:
+- rollups/<conjunto>_mensal.csv       → estação, ano, mes
+- rollups/<conjunto>_anual.csv        → estação, ano
+- rollups/<conjunto>_climatologia.csv → estação, dia_ano
+
+com as colunas <variavel>_soma, <variavel>_n e <variavel>_media.
+
+A cada atualização apenas os dias recebidos são considerados: a
+contribuição antiga desses dias é subtraída e a nova é somada. Assim um
+dia reprocessado não é contado duas vezes e os arquivos diários por
+estação não precisam ser relidos.
+
+Os valores diários já contabilizados ficam em uma base particionada por
+estação e ano (rollups/base/<conjunto>/<estação>/<ano>.csv); cada
+atualização lê e regrava apenas as partições dos dias recebidos.
+
+Tabelas e partições são gravadas primeiro em arquivos temporários e só
+então substituídas. Enquanto as substituições ocorrem existe o marcador
+rollups/<conjunto>.incompleto; se uma execução for interrompida nesse
+ponto, a próxima atualização encontra o marcador e reconstrói os rollups
+a partir dos dados diários antes de continuar.
+
+Radiação: os valores diários são a soma das horas disponíveis (GL, DF, DT).
+
+Exemplo de uso (reconstrução completa a partir dos dados existentes):
+python aemet_rollups.py --reconstruir
+python aemet_rollups.py --reconstruir --conjunto radiacao
+"""
+
+# =========================================================
+# Bibliotecas
+# =========================================================
+import argparse
+import os
+import shutil
+
+import pandas as pd
+
+from aemet_quality_control import carregar_insolacao, carregar_radiacao
+
+# =========================================================
+# CONFIGURAÇÕES
+# =========================================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROLLUPS_DIR = os.path.join(BASE_DIR, "rollups")
+
+NIVEIS = {
+    "mensal": ["ano", "mes"],
+    "anual": ["ano"],
+    "climatologia": ["dia_ano"],
+}
+
+
+# =========================================================
+# FUNÇÕES AUXILIARES
+# =========================================================
+def caminho_tabela(conjunto, nome):
+    return os.path.join(ROLLUPS_DIR, f"{conjunto}_{nome}.csv")
+
+
+def caminho_base(conjunto, estacao, ano):
+    estacao = str(estacao).replace("/", "-")
+    return os.path.join(ROLLUPS_DIR, "base", conjunto, estacao, f"{ano}.csv")
+
+
+def caminho_marcador(conjunto):
+    return os.path.join(ROLLUPS_DIR, f"{conjunto}.incompleto")
+
+
+def ler_tabela(path, chave):
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, dtype={chave: str})
+
+
+def agregar(df, chave, nivel, colunas):
+    """Soma e contagem (valores não nulos) por estação e nível."""
+    df = df.assign(
+        ano=df["data"].dt.year,
+        mes=df["data"].dt.month,
+        dia_ano=df["data"].dt.dayofyear,
+    )
+    grupos = df.groupby([chave] + NIVEIS[nivel])[colunas]
+
+    soma = grupos.sum().add_suffix("_soma")
+    n = grupos.count().add_suffix("_n")
+    return pd.concat([soma, n], axis=1)
+
+
+def aplicar_delta(tabela, novo, antigo, chave, nivel, colunas):
+    """Soma a contribuição nova e subtrai a antiga na tabela existente."""
+    indice = [chave] + NIVEIS[nivel]
+
+    if tabela is None:
+        atual = novo.iloc[0:0]
+    else:
+        atual = tabela.set_index(indice)[novo.columns]
+
+    atual = atual.add(novo, fill_value=0).sub(antigo, fill_value=0)
+
+    for col in colunas:
+        n = atual[f"{col}_n"]
+        atual[f"{col}_n"] = n.astype(int)
+        atual[f"{col}_media"] = atual[f"{col}_soma"] / n.where(n > 0)
+
+    return atual.sort_index().reset_index()
+
+
+# =========================================================
+# FUNÇÃO PRINCIPAL: ATUALIZAR ROLLUPS
+# =========================================================
+def atualizar_rollups(conjunto, df_diario, chave, colunas):
+    """
+    Atualiza os rollups do conjunto com os dias de df_diario.
+
+    df_diario deve conter as colunas <chave>, "data" e as variáveis em
+    `colunas`, com um valor diário por estação. Dias já presentes na base
+    são substituídos pelos novos valores.
+    """
+    if df_diario.empty:
+        return
+
+    os.makedirs(ROLLUPS_DIR, exist_ok=True)
+
+    if os.path.exists(caminho_marcador(conjunto)):
+        print(f"⚠ Rollups de {conjunto} incompletos "
+              f"(execução interrompida); reconstruindo...")
+        reconstruir(conjunto)
+
+    novo = df_diario[[chave, "data"] + colunas].copy()
+    novo[chave] = novo[chave].astype(str)
+    novo["data"] = pd.to_datetime(novo["data"]).dt.normalize()
+    novo = novo.drop_duplicates(subset=[chave, "data"], keep="last")
+
+    # Contribuição antiga dos mesmos dias (só as partições afetadas)
+    antigos = []
+    particoes = {}
+
+    for (estacao, ano), novo_part in novo.groupby(
+        [chave, novo["data"].dt.year]
+    ):
+        path = caminho_base(conjunto, estacao, ano)
+        base = ler_tabela(path, chave)
+
+        if base is not None:
+            base["data"] = pd.to_datetime(base["data"])
+            repetidos = base["data"].isin(novo_part["data"])
+            antigos.append(base[repetidos])
+            novo_part = pd.concat(
+                [base[~repetidos], novo_part],
+                ignore_index=True,
+            )
+
+        particoes[path] = novo_part
+
+    antigo = pd.concat(antigos, ignore_index=True) if antigos else novo[:0]
+
+    # 1. Grava tudo em temporários
+    temporarios = []
+
+    for nivel in NIVEIS:
+        path = caminho_tabela(conjunto, nivel)
+        tabela = aplicar_delta(
+            ler_tabela(path, chave),
+            agregar(novo, chave, nivel, colunas),
+            agregar(antigo, chave, nivel, colunas),
+            chave,
+            nivel,
+            colunas,
+        )
+        tabela.to_csv(path + ".tmp", index=False, encoding="utf-8")
+        temporarios.append(path)
+
+    for path, base in particoes.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        base.sort_values("data").to_csv(
+            path + ".tmp",
+            index=False,
+            encoding="utf-8",
+            date_format="%Y-%m-%d",
+        )
+        temporarios.append(path)
+
+    # 2. Substitui tabelas e partições juntas, sob o marcador
+    marcador = caminho_marcador(conjunto)
+    open(marcador, "w").close()
+
+    for path in temporarios:
+        os.replace(path + ".tmp", path)
+
+    os.remove(marcador)
+
+
+def diario_radiacao(df):
+    """Totais diários (soma das horas disponíveis) de GL, DF e DT."""
+    return (
+        df.groupby(["estacao", "date"])[["GL", "DF", "DT"]]
+        .sum(min_count=1)
+        .reset_index()
+        .rename(columns={"date": "data"})
+    )
+
+
+# =========================================================
+# RECONSTRUÇÃO COMPLETA
+# =========================================================
+def reconstruir(conjunto):
+    paths = [caminho_tabela(conjunto, nome) for nome in NIVEIS]
+    paths.append(caminho_marcador(conjunto))
+
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    shutil.rmtree(os.path.join(ROLLUPS_DIR, "base", conjunto),
+                  ignore_errors=True)
+
+    if conjunto == "insolacao":
+        atualizar_rollups(
+            "insolacao",
+            carregar_insolacao(),
+            "cod",
+            ["insolacao"],
+        )
+    else:
+        atualizar_rollups(
+            "radiacao",
+            diario_radiacao(carregar_radiacao()),
+            "estacao",
+            ["GL", "DF", "DT"],
+        )
+
+    print(f"✔ Rollups reconstruídos: {conjunto}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollups AEMET")
+    parser.add_argument(
+        "--reconstruir",
+        action="store_true",
+        help="Recalcula os rollups a partir de todos os dados diários",
+    )
+    parser.add_argument(
+        "--conjunto",
+        choices=["insolacao", "radiacao", "todos"],
+        default="todos",
+        help="Conjunto de dados (default: todos)",
+    )
+    args = parser.parse_args()
+
+    if not args.reconstruir:
+        parser.print_help()
+        return
+
+    conjuntos = (
+        ["insolacao", "radiacao"]
+        if args.conjunto == "todos"
+        else [args.conjunto]
+    )
+    for conjunto in conjuntos:
+        reconstruir(conjunto)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 # -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+import pandas as pd
+
+
 # Funções
 
 def gms_to_decimal(gms):
@@ -22,6 +28,76 @@ def gms_to_decimal(gms):
 
     return decimal
 
+
+def duracao_dia(lat, dia_do_ano):
+    """
+    Duração astronômica do dia (horas) para latitude e dia do ano.
+    Aceita escalares ou arrays (vetorizado com numpy).
+    in: 40.4, 172
+    out: 14.9 h
+
+    """
+    phi = np.radians(np.asarray(lat, dtype=float))
+    n = np.asarray(dia_do_ano, dtype=float)
+
+    # declinação solar (Cooper, 1969)
+    delta = np.radians(23.45) * np.sin(np.radians(360 / 365 * (284 + n)))
+
+    # cosseno do ângulo horário do pôr do sol, limitado a [-1, 1]
+    # (dia/noite polar)
+    cos_ws = np.clip(-np.tan(phi) * np.tan(delta), -1.0, 1.0)
+
+    return 24 / np.pi * np.arccos(cos_ws)
+
+
+def para_numerico(serie):
+    """
+    Converte valores da AEMET para float.
+    in: "9,8" | "Ip" | "Acum" | 9.8
+    out: 9.8 | 0.0 | NaN | 9.8
+
+    "Ip" (precipitação inapreciável) vira 0; demais textos viram NaN.
+    """
+    texto = serie.astype("string").str.strip()
+    texto = texto.str.replace(",", ".", regex=False)
+    texto = texto.replace("Ip", "0")
+    return pd.to_numeric(texto, errors="coerce").astype(float)
+
+
+def salvar_inventario_binario(df, path_cache):
+    """
+    Grava o inventário já interpretado (pickle):
+    latitud/longitud em graus decimais e altitud inteira.
+    """
+    df = df.copy()
+    df["latitud"] = df["latitud"].apply(gms_to_decimal)
+    df["longitud"] = df["longitud"].apply(gms_to_decimal)
+    df["altitud"] = pd.to_numeric(df["altitud"], errors="coerce").astype(
+        "Int64"
+    )
+    df.to_pickle(path_cache)
+    return df
+
+
+def carregar_inventario(path="todas_estacoes.csv"):
+    """
+    Carrega o inventário de estações já interpretado.
+
+    Usa a forma binária (mesmo nome, extensão .pkl) quando ela é mais
+    recente que o CSV ou quando só ela existe; caso contrário interpreta
+    o CSV e regrava o cache.
+    """
+    path_cache = os.path.splitext(path)[0] + ".pkl"
+
+    if os.path.exists(path_cache) and (
+        not os.path.exists(path)
+        or os.path.getmtime(path_cache) >= os.path.getmtime(path)
+    ):
+        return pd.read_pickle(path_cache)
+
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return salvar_inventario_binario(df, path_cache)
+
 # Listas
 
 cod_rad = ["1387", "1111", "2661", 